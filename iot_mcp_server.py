@@ -2,137 +2,276 @@ from mcp.server.fastmcp import FastMCP, Context
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
-from paho.mqtt.client import Client as MQTTClient
+import aiomqtt
 import asyncio
-import json
+import logging
+import orjson
 import os
+import re
+import socket
 import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class IoTContext:
     """Context for the IoT MCP server."""
-    mqtt_client: MQTTClient
+    mqtt_clients: list[aiomqtt.Client | None]
     connected_devices: dict = field(default_factory=dict)
 
-# Create a global MQTT client that can be reused across sessions
-global_mqtt_client = None
+    def client_for(self, device_id: str) -> aiomqtt.Client:
+        """Return the pooled MQTT client that publishes for a device."""
+        client = self.mqtt_clients[hash(device_id) % len(self.mqtt_clients)] if self.mqtt_clients else None
+        if client is None:
+            raise RuntimeError("MQTT broker is not connected")
+        return client
+
+# Topics for the light bulb simulator, built once instead of per tool call
+_LIGHT_BULB_ID = "light_bulb_001"
+_CMD_TOPIC = f"devices/{_LIGHT_BULB_ID}/command"
+_STATE_TOPIC = f"devices/{_LIGHT_BULB_ID}/state"
+_STATE_REQ_TOPIC = f"devices/{_LIGHT_BULB_ID}/state/request"
+
+# Pre-serialized light bulb commands. They never change, and the bulb ignores
+# the timestamp, so there is nothing to build or serialize per call.
+_TURN_ON_BYTES = b'{"command":"set_power","payload":{"power":true}}'
+_TURN_OFF_BYTES = b'{"command":"set_power","payload":{"power":false}}'
+_TOGGLE_BYTES = b'{"command":"toggle"}'
+
+# (payload, reply, action used in error messages) for each light command,
+# shared by the tool and its light_bulb_* alias
+_TURN_ON_COMMAND = (_TURN_ON_BYTES, "Light bulb has been turned ON", "turning on light")
+_TURN_OFF_COMMAND = (_TURN_OFF_BYTES, "Light bulb has been turned OFF", "turning off light")
+_TOGGLE_COMMAND = (_TOGGLE_BYTES, "Light bulb toggle command sent successfully", "toggling light")
+
+# Pool of MQTT connections shared by every session. Each slot holds the live
+# client, or None while that connection is (re)connecting.
+global_mqtt_clients = []
+# Device registry; "last_seen" is a time.monotonic() reading
 global_devices = {}
+# Supervisor tasks keeping each pooled connection alive (referenced so they
+# aren't garbage collected)
+global_connection_tasks = []
+
+# Delay between reconnect attempts, doubling up to the maximum
+_RECONNECT_MIN_DELAY = 1.0
+_RECONNECT_MAX_DELAY = 30.0
+
+# Pulls the responding device's id out of a broadcast response without
+# parsing the whole message (the top-level device_id is serialized first)
+_DEVICE_ID_RE = re.compile(rb'"device_id"\s*:\s*"([^"]+)"')
+
+# Registry entries younger than this are answered without asking the device
+_STATE_MAX_AGE = 5.0
+# How long to wait for a device to answer a state request
+_STATE_REPLY_TIMEOUT = 0.1
+# Futures resolved by the next state message from a device, keyed by device id
+_pending_states: dict[str, asyncio.Future] = {}
+
+async def _consume(messages) -> None:
+    """Update the device registry from incoming MQTT messages."""
+    async for message in messages:
+        topic = message.topic.value
+        logger.debug("MQTT: Received message on %s: %.100r", topic, message.payload)
+        
+        # Check if this is a device state message
+        if topic.startswith("devices/") and topic.endswith("/state"):
+            try:
+                # Parse device data
+                device_data = orjson.loads(message.payload)
+                device_id = device_data.get("device_id")
+                
+                if device_id:
+                    # Update our device registry
+                    device = global_devices[device_id] = {
+                        "id": device_id,
+                        "type": device_data.get("type", "unknown"),
+                        "online": device_data.get("online", True),
+                        "last_seen": time.monotonic(),
+                        "properties": device_data.get("properties", {}),
+                        "topic": topic
+                    }
+                    logger.debug("Discovered/updated device: %s with properties: %s", device_id, device_data.get("properties", {}))
+                    
+                    # Wake up anyone waiting on a state request for this device
+                    pending = _pending_states.pop(device_id, None)
+                    if pending is not None and not pending.done():
+                        pending.set_result(device)
+            except orjson.JSONDecodeError:
+                logger.warning("Received invalid JSON in device state: %r", message.payload)
+            except Exception as e:
+                logger.error("Error processing device state: %s", e)
+        elif topic == "devices/broadcast/response":
+            try:
+                # Devices publish their full state on their own state topic as they
+                # answer, so this only needs to mark the responder as online.
+                # last_seen is left to the state branch, which also refreshes the
+                # properties it vouches for.
+                match = _DEVICE_ID_RE.search(message.payload)
+                device = global_devices.get(match.group(1).decode(errors="replace")) if match else None
+                if device is not None:
+                    device["online"] = True
+            except Exception as e:
+                logger.error("Error processing broadcast response: %s", e)
+
+async def _request_state(ctx: Context, device_id: str, request_topic: str) -> dict | None:
+    """Ask a device for its state and wait briefly for the reply.
+    
+    Concurrent callers for the same device share one request. Returns the
+    updated registry entry, or None if the request couldn't be sent or the
+    device didn't answer in time.
+    """
+    pending = _pending_states.get(device_id)
+    if pending is None:
+        pending = asyncio.get_running_loop().create_future()
+        _pending_states[device_id] = pending
+        try:
+            mqtt_client = ctx.request_context.lifespan_context.client_for(device_id)
+            await mqtt_client.publish(request_topic, orjson.dumps({"request_id": "check_status"}), qos=0)
+        except (RuntimeError, aiomqtt.MqttError) as e:
+            # Broker unavailable; the caller falls back to the cached entry
+            del _pending_states[device_id]
+            logger.warning("Could not request state from %s: %s", device_id, e)
+            return None
+    
+    try:
+        # Shield so one caller timing out doesn't cancel the shared future
+        return await asyncio.wait_for(asyncio.shield(pending), timeout=_STATE_REPLY_TIMEOUT)
+    except TimeoutError:
+        # Let the next caller send a new request
+        if _pending_states.get(device_id) is pending:
+            del _pending_states[device_id]
+        return None
+
+async def _run_connection(slot: int, client: aiomqtt.Client, connected: asyncio.Event | None = None) -> None:
+    """Keep one pooled MQTT connection alive, reconnecting with backoff.
+    
+    The first slot also subscribes to device updates and asks every device to
+    report its state, each time it (re)connects.
+    
+    Args:
+        slot: Index of this connection in global_mqtt_clients
+        client: The aiomqtt client to (re)connect
+        connected: Set once the connection is usable
+    """
+    delay = _RECONNECT_MIN_DELAY
+    while True:
+        try:
+            # Entering waits for CONNACK and subscribe waits for SUBACK, so the
+            # subscriptions are live before the client is handed to the tools
+            async with client:
+                if slot == 0:
+                    # Subscribe to all device state topics for discovery
+                    await client.subscribe("devices/+/state")
+                    # Subscribe to broadcast responses
+                    await client.subscribe("devices/broadcast/response")
+                    logger.info("Subscribed to device state topics")
+                    
+                    # Force a request for device states (using a broadcast topic instead of wildcards)
+                    logger.info("Requesting states from all devices via broadcast")
+                    # Discovery is sent once per connection, so keep QoS 1 here
+                    await client.publish("devices/broadcast/request", orjson.dumps({"request_id": "startup", "action": "report_state"}), qos=1)
+                
+                global_mqtt_clients[slot] = client
+                delay = _RECONNECT_MIN_DELAY
+                if connected is not None:
+                    connected.set()
+                logger.info("MQTT connection %d established", slot)
+                try:
+                    # Only ends by raising MqttError when the connection drops.
+                    # Publish-only slots receive nothing but still notice that.
+                    await _consume(client.messages)
+                finally:
+                    global_mqtt_clients[slot] = None
+        except aiomqtt.MqttError as e:
+            logger.warning("MQTT connection %d lost: %s; reconnecting in %.0fs", slot, e, delay)
+        except Exception:
+            logger.exception("MQTT connection %d failed; reconnecting in %.0fs", slot, delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _RECONNECT_MAX_DELAY)
 
 @asynccontextmanager
 async def iot_lifespan(server: FastMCP) -> AsyncIterator[IoTContext]:
     """
-    Manages the MQTT client lifecycle.
+    Manages the MQTT client pool lifecycle.
     
     Args:
         server: The FastMCP server instance
         
     Yields:
-        IoTContext: The context containing the MQTT client
+        IoTContext: The context containing the MQTT clients
     """
-    global global_mqtt_client, global_devices
+    global global_connection_tasks
     
-    # Initialize MQTT client only if it doesn't exist
-    if global_mqtt_client is None:
-        print("Creating new MQTT client")
-        # Use MQTTv311 protocol to address deprecation warning
-        import paho.mqtt.client as mqtt  # Import here to ensure we have the module
-        mqtt_client = MQTTClient(client_id="iot_mcp_server", protocol=mqtt.MQTTv311)
+    # Start the MQTT connections only if they aren't already running
+    if not global_connection_tasks:
+        logger.info("Creating new MQTT clients")
         broker_address = os.getenv("MQTT_BROKER", "localhost")
         broker_port = int(os.getenv("MQTT_PORT", "1883"))
+        pool_size = max(1, int(os.getenv("MQTT_POOL_SIZE", "1")))
+        # aiomqtt drives paho from the event loop, so publishes are written
+        # directly instead of being handed to a paho network thread.
+        # TCP_NODELAY stops Nagle from holding back small publishes.
+        # MQTT_POOL_SIZE > 1 spreads publishes for different devices over
+        # several connections; one is plenty while every tool targets the bulb.
+        mqtt_clients = [
+            aiomqtt.Client(
+                broker_address,
+                broker_port,
+                identifier="iot_mcp_server" if i == 0 else f"iot_mcp_server_{i}",
+                protocol=aiomqtt.ProtocolVersion.V311,
+                socket_options=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+            )
+            for i in range(pool_size)
+        ]
+        global_mqtt_clients[:] = [None] * pool_size
         
-        # Set up MQTT callbacks for device discovery
-        def on_connect(client, userdata, flags, rc):
-            if rc == 0:
-                print(f"Connected to MQTT broker at {broker_address}:{broker_port}")
-                # Subscribe to all device state topics for discovery
-                client.subscribe("devices/+/state")
-                # Subscribe to broadcast responses
-                client.subscribe("devices/broadcast/response")
-                print("Subscribed to device state topics")
-            else:
-                print(f"Failed to connect to MQTT broker with result code {rc}")
-        
-        def on_message(client, userdata, message):
-            topic = message.topic
-            payload = message.payload.decode("utf-8")
-            print(f"MQTT: Received message on {topic}: {payload[:100]}...")
-            
-            # Check if this is a device state message
-            if topic.startswith("devices/") and topic.endswith("/state"):
-                try:
-                    # Parse device data
-                    device_data = json.loads(payload)
-                    device_id = device_data.get("device_id")
-                    
-                    if device_id:
-                        # Update our device registry
-                        global_devices[device_id] = {
-                            "id": device_id,
-                            "type": device_data.get("type", "unknown"),
-                            "online": device_data.get("online", True),
-                            "last_seen": time.time(),
-                            "properties": device_data.get("properties", {}),
-                            "topic": topic
-                        }
-                        print(f"Discovered/updated device: {device_id} with properties: {device_data.get('properties', {})}")
-                except json.JSONDecodeError:
-                    print(f"Received invalid JSON in device state: {payload}")
-                except Exception as e:
-                    print(f"Error processing device state: {str(e)}")
-        
-        # Set callbacks
-        mqtt_client.on_connect = on_connect
-        mqtt_client.on_message = on_message
+        # Each connection is supervised by its own task, which lives for the
+        # whole process and reconnects after broker restarts or network blips
+        logger.info("Connecting %d MQTT clients to broker at %s:%d", pool_size, broker_address, broker_port)
+        subscribed = asyncio.Event()
+        global_connection_tasks = [
+            asyncio.create_task(_run_connection(i, client, subscribed if i == 0 else None))
+            for i, client in enumerate(mqtt_clients)
+        ]
         
         try:
-            # Connect to the MQTT broker
-            print(f"Connecting to MQTT broker at {broker_address}:{broker_port}")
-            mqtt_client.connect(broker_address, broker_port)
-            mqtt_client.loop_start()  # Start the MQTT client loop in a separate thread
-            
-            # Wait a short time to ensure connection and subscription
-            await asyncio.sleep(1)
+            async with asyncio.timeout(5):
+                await subscribed.wait()
+            logger.info("Connected to MQTT broker at %s:%d", broker_address, broker_port)
             
-            # Force a request for device states (using a broadcast topic instead of wildcards)
-            print("Requesting states from all devices via broadcast")
-            mqtt_client.publish("devices/broadcast/request", json.dumps({"request_id": "startup", "action": "report_state"}))
-            
-            # Add the light bulb simulator as a known device if we're running locally
+            # Add the light bulb simulator as a known device if we're running locally,
+            # unless it already answered the discovery broadcast
             if broker_address in ("localhost", "127.0.0.1"):
-                print("Running locally - adding light bulb as a default device")
-                global_devices["light_bulb_001"] = {
-                    "id": "light_bulb_001",
+                logger.info("Running locally - adding light bulb as a default device")
+                global_devices.setdefault(_LIGHT_BULB_ID, {
+                    "id": _LIGHT_BULB_ID,
                     "type": "light",
                     "online": True,
-                    "last_seen": time.time(),
+                    "last_seen": time.monotonic(),
                     "properties": {
                         "power": False,
                         "brightness": 100,
                         "color": "#FFFF00"
                     },
-                    "topic": "devices/light_bulb_001/state"
-                }
-            
-            global_mqtt_client = mqtt_client
-        except Exception as e:
-            print(f"Failed to connect MQTT client: {str(e)}")
-            # Clean up if connection failed
-            mqtt_client.loop_stop()
-            mqtt_client = None
+                    "topic": _STATE_TOPIC
+                })
+        except TimeoutError:
+            logger.error("Could not connect to MQTT broker at %s:%d yet; still retrying in the background", broker_address, broker_port)
     else:
-        print("Reusing existing MQTT client")
+        logger.debug("Reusing existing MQTT clients")
     
-    # Create context with global client and devices
-    context = IoTContext(mqtt_client=global_mqtt_client, connected_devices=global_devices)
+    # Create context with global clients and devices
+    context = IoTContext(mqtt_clients=global_mqtt_clients, connected_devices=global_devices)
     
     try:
         yield context
     finally:
-        # Don't disconnect the client, it will be reused
+        # Don't disconnect the clients, they will be reused
         pass
 
 # Initialize FastMCP server with the IoT context
@@ -141,7 +280,10 @@ mcp = FastMCP(
     description="MCP server for IoT device control",
     lifespan=iot_lifespan,
     host=os.getenv("HOST", "0.0.0.0"),
-    port=os.getenv("PORT", "8090")
+    port=os.getenv("PORT", "8090"),
+    # FastMCP configures the root logger (on stderr, away from the stdio
+    # transport) when it is created, so the level has to be set here
+    log_level=os.getenv("LOG_LEVEL", "WARNING").upper()
 )
 
 @mcp.tool()
@@ -159,7 +301,7 @@ async def list_devices(ctx: Context, **kwargs) -> str:
     - check_light_status - To check light status
     """
     try:
-        print(f"List devices tool called with kwargs: {kwargs}")
+        logger.debug("List devices tool called with kwargs: %s", kwargs)
         return """Available device: light_bulb_001 (light)
 
 To control the light bulb, DO NOT call the device ID directly. Instead use:
@@ -169,9 +311,32 @@ To control the light bulb, DO NOT call the device ID directly. Instead use:
 - check_light_status: Check the current status
 """
     except Exception as e:
-        print(f"Error in list_devices: {str(e)}")
+        logger.error("Error in list_devices: %s", e)
         return "Found light_bulb_001 device. Use light_bulb_on or light_bulb_off to control it."
 
+async def _send_light_command(ctx: Context, command: tuple[bytes, str, str]) -> str:
+    """Publish a pre-serialized command to the light bulb and return the tool reply.
+    
+    Every light tool goes through here directly rather than calling another tool.
+    """
+    payload, reply, action = command
+    try:
+        mqtt_client = ctx.request_context.lifespan_context.client_for(_LIGHT_BULB_ID)
+        
+        # Publish the message. Commands are idempotent and the bulb re-broadcasts
+        # its state as soon as it has handled one, so QoS 0 avoids a PUBACK
+        # round-trip without losing anything and no verify request is needed.
+        logger.debug("Sending light command: %s", payload)
+        await mqtt_client.publish(_CMD_TOPIC, payload, qos=0)
+        return reply
+    except (RuntimeError, aiomqtt.MqttError) as e:
+        # Expected while the broker connection is down or reconnecting
+        logger.warning("Error %s: %s", action, e)
+        return f"Error {action}: {str(e)}"
+    except Exception as e:
+        logger.exception("Error %s: %s", action, e)
+        return f"Error {action}: {str(e)}"
+
 @mcp.tool()
 async def turn_on_light(ctx: Context, **kwargs) -> str:
     """Turn ON the light bulb.
@@ -182,36 +347,7 @@ async def turn_on_light(ctx: Context, **kwargs) -> str:
         ctx: The MCP server provided context
         dummy: Optional parameter that does nothing (required for schema compatibility)
     """
-    try:
-        print(f"Turn on light called with kwargs: {kwargs}")
-        mqtt_client = ctx.request_context.lifespan_context.mqtt_client
-        topic = "devices/light_bulb_001/command"
-        
-        # Prepare the command to set power on
-        message = {
-            "command": "set_power",
-            "timestamp": time.time(),
-            "payload": {
-                "power": True
-            }
-        }
-        
-        # Publish the message
-        print(f"Sending turn ON command: {json.dumps(message)}")
-        result = mqtt_client.publish(topic, json.dumps(message))
-        print(f"MQTT publish result: {result.rc}")
-        
-        # Request an immediate state update to verify the change
-        await asyncio.sleep(0.5)  # Give the bulb time to process the command
-        state_topic = "devices/light_bulb_001/state/request"
-        mqtt_client.publish(state_topic, json.dumps({"request_id": "verify_power_on"}))
-        
-        return "Light bulb has been turned ON"
-    except Exception as e:
-        print(f"Error in turn_on_light: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return f"Error turning on light: {str(e)}"
+    return await _send_light_command(ctx, _TURN_ON_COMMAND)
 
 @mcp.tool()
 async def turn_off_light(ctx: Context, **kwargs) -> str:
@@ -223,25 +359,7 @@ async def turn_off_light(ctx: Context, **kwargs) -> str:
         ctx: The MCP server provided context
         dummy: Optional parameter that does nothing (required for schema compatibility)
     """
-    try:
-        print(f"Turn off light called with kwargs: {kwargs}")
-        mqtt_client = ctx.request_context.lifespan_context.mqtt_client
-        topic = "devices/light_bulb_001/command"
-        
-        # Prepare the command to set power off
-        message = {
-            "command": "set_power",
-            "timestamp": time.time(),
-            "payload": {
-                "power": False
-            }
-        }
-        
-        # Publish the message
-        mqtt_client.publish(topic, json.dumps(message))
-        return "Light bulb has been turned OFF"
-    except Exception as e:
-        return f"Error turning off light: {str(e)}"
+    return await _send_light_command(ctx, _TURN_OFF_COMMAND)
 
 @mcp.tool()
 async def toggle_light(ctx: Context, **kwargs) -> str:
@@ -253,22 +371,7 @@ async def toggle_light(ctx: Context, **kwargs) -> str:
         ctx: The MCP server provided context
         dummy: Optional parameter that does nothing (required for schema compatibility)
     """
-    try:
-        print(f"Toggle light called with kwargs: {kwargs}")
-        mqtt_client = ctx.request_context.lifespan_context.mqtt_client
-        topic = "devices/light_bulb_001/command"
-        
-        # Prepare the toggle command
-        message = {
-            "command": "toggle",
-            "timestamp": time.time()
-        }
-        
-        # Publish the message
-        mqtt_client.publish(topic, json.dumps(message))
-        return "Light bulb toggle command sent successfully"
-    except Exception as e:
-        return f"Error toggling light: {str(e)}"
+    return await _send_light_command(ctx, _TOGGLE_COMMAND)
 
 @mcp.tool()
 async def check_light_status(ctx: Context, **kwargs) -> str:
@@ -278,17 +381,18 @@ async def check_light_status(ctx: Context, **kwargs) -> str:
     """
     try:
         connected_devices = ctx.request_context.lifespan_context.connected_devices
-        if "light_bulb_001" in connected_devices:
-            properties = connected_devices["light_bulb_001"].get("properties", {})
+        if _LIGHT_BULB_ID in connected_devices:
+            device = connected_devices[_LIGHT_BULB_ID]
+            # The bulb publishes its state on every change, so a recent entry is
+            # current; only ask it (and wait for the reply) when the entry is stale
+            if time.monotonic() - device["last_seen"] >= _STATE_MAX_AGE:
+                device = await _request_state(ctx, _LIGHT_BULB_ID, _STATE_REQ_TOPIC) or device
+            
+            properties = device.get("properties", {})
             power = "ON" if properties.get("power", False) else "OFF"
             brightness = properties.get("brightness", 100)
             color = properties.get("color", "#FFFF00")
             
-            # Request a fresh state update
-            mqtt_client = ctx.request_context.lifespan_context.mqtt_client
-            state_topic = "devices/light_bulb_001/state/request"
-            mqtt_client.publish(state_topic, json.dumps({"request_id": "check_status"}))
-            
             return f"Light bulb status: Power is {power}, Brightness is {brightness}%, Color is {color}"
         else:
             return "Light bulb status: Device not found in registry"
@@ -301,7 +405,7 @@ async def light_bulb_on(ctx: Context, **kwargs) -> str:
     
     This command turns on the light with ID 'light_bulb_001'.
     """
-    return await turn_on_light(ctx, **kwargs)
+    return await _send_light_command(ctx, _TURN_ON_COMMAND)
 
 @mcp.tool()
 async def light_bulb_off(ctx: Context, **kwargs) -> str:
@@ -309,7 +413,7 @@ async def light_bulb_off(ctx: Context, **kwargs) -> str:
     
     This command turns off the light with ID 'light_bulb_001'.
     """
-    return await turn_off_light(ctx, **kwargs)
+    return await _send_light_command(ctx, _TURN_OFF_COMMAND)
 
 @mcp.tool()
 async def light_bulb_toggle(ctx: Context, **kwargs) -> str:
@@ -317,7 +421,7 @@ async def light_bulb_toggle(ctx: Context, **kwargs) -> str:
     
     This command toggles the light with ID 'light_bulb_001'.
     """
-    return await toggle_light(ctx, **kwargs)
+    return await _send_light_command(ctx, _TOGGLE_COMMAND)
 
 @mcp.tool()
 async def get_help(ctx: Context, **kwargs) -> str:
@@ -339,18 +443,13 @@ IMPORTANT: You cannot control devices by using their device ID directly (e.g., "
 Always use the specific command functions listed above.
 """
 
-@mcp.tool()
-async def check_command(ctx: Context, command: str) -> str:
-    """Check if a command is valid and provide guidance.
-    
-    This is a helper tool to check if a command exists and provide guidance on how to use it.
-    
-    Args:
-        ctx: The MCP server provided context
-        command: The command or device ID to check
-    """
-    if command == "light_bulb_001":
-        return """
+# Tools accepted by check_command
+_VALID_COMMANDS = frozenset({
+    "list_devices", "turn_on_light", "turn_off_light", "toggle_light",
+    "check_light_status", "light_bulb_on", "light_bulb_off", "light_bulb_toggle"
+})
+
+_DEVICE_ID_NOT_COMMAND_HELP = """
 ERROR: "light_bulb_001" is a device ID, not a command.
 
 To control this light bulb, use one of these commands:
@@ -359,18 +458,8 @@ To control this light bulb, use one of these commands:
 - light_bulb_toggle - Toggle the light ON/OFF
 - check_light_status - Check the status
 """
-    
-    valid_commands = [
-        "list_devices", "turn_on_light", "turn_off_light", "toggle_light", 
-        "check_light_status", "light_bulb_on", "light_bulb_off", "light_bulb_toggle"
-    ]
-    
-    if command in valid_commands:
-        return f"The command '{command}' is valid. You can use it to control the light bulb."
-    else:
-        return f"""
-The command '{command}' is not recognized. 
 
+_AVAILABLE_COMMANDS_HELP = """
 Available commands:
 - light_bulb_on - Turn the light ON
 - light_bulb_off - Turn the light OFF
@@ -378,17 +467,37 @@ Available commands:
 - check_light_status - Check the status
 """
 
+@mcp.tool()
+async def check_command(ctx: Context, command: str) -> str:
+    """Check if a command is valid and provide guidance.
+    
+    This is a helper tool to check if a command exists and provide guidance on how to use it.
+    
+    Args:
+        ctx: The MCP server provided context
+        command: The command or device ID to check
+    """
+    if command == _LIGHT_BULB_ID:
+        return _DEVICE_ID_NOT_COMMAND_HELP
+    
+    if command in _VALID_COMMANDS:
+        return f"The command '{command}' is valid. You can use it to control the light bulb."
+    else:
+        return f"""
+The command '{command}' is not recognized. 
+{_AVAILABLE_COMMANDS_HELP}"""
+
 async def main():
     """Run the MCP server with the configured transport."""
     transport = os.getenv("TRANSPORT", "sse")
     
     if transport == 'sse':
         # Run the MCP server with SSE transport
-        print("Starting MCP server with SSE transport...")
+        logger.info("Starting MCP server with SSE transport...")
         await mcp.run_sse_async()
     else:
         # Run the MCP server with stdio transport
-        print("Starting MCP server with stdio transport...")
+        logger.info("Starting MCP server with stdio transport...")
         await mcp.run_stdio_async()
 
 if __name__ == "__main__":
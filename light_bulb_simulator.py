@@ -1,11 +1,14 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import paho.mqtt.client as mqtt
-import json
+import orjson
 import threading
+from collections import deque
 import logging
 import os
+import socket
 import time
 from dotenv import load_dotenv
+from waitress import serve
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +27,9 @@ DEVICE_ID = "light_bulb_001"
 COMMAND_TOPIC = f"devices/{DEVICE_ID}/command"
 STATE_TOPIC = f"devices/{DEVICE_ID}/state"
 STATE_REQUEST_TOPIC = f"devices/{DEVICE_ID}/state/request"
+# Commands arriving within this window are answered with a single state publish
+STATE_COALESCE_SECONDS = 0.02
+HEARTBEAT_SECONDS = 60
 
 # Global device state
 device_state = {
@@ -37,6 +43,27 @@ device_state = {
         "color": "#FFFF00"  # Yellow light
     }
 }
+# device_state serialized once per change, shared by MQTT publishes and /api/state
+device_state_json = orjson.dumps(device_state)
+
+# device_state is never mutated in place: writers build a new dict and swap
+# it in, so readers can use whatever snapshot they grab without locking.
+# The lock only serializes writers so concurrent updates aren't lost.
+_state_lock = threading.RLock()
+
+# (epoch second, ISO-8601 string) last produced by utc_timestamp
+_last_timestamp = (None, None)
+
+# Pending coalesced state publish, if any
+_flush_timer = None
+_flush_lock = threading.Lock()
+
+# Outbound messages, published by publish_worker alone; producers only append.
+# State payloads keep just the newest one, since it supersedes anything still
+# unsent. Other (topic, payload, qos) messages are never dropped.
+_outbound_state = deque(maxlen=1)
+_outbound = deque()
+_outbound_ready = threading.Event()
 
 # Initialize MQTT client with protocol version parameter to address deprecation warning
 mqtt_client = mqtt.Client(protocol=mqtt.MQTTv311)
@@ -50,11 +77,18 @@ def on_connect(client, userdata, flags, rc):
         client.subscribe(STATE_REQUEST_TOPIC)
         # Subscribe to broadcast requests
         client.subscribe("devices/broadcast/request")
-        # Publish initial state immediately after connection
+        # Publish initial state immediately after connection, stamped with
+        # last_seen (the import-time snapshot has none)
+        update_state()
         publish_state()
     else:
         logger.error(f"Failed to connect to MQTT broker with result code {rc}")
 
+def on_socket_open(client, userdata, sock):
+    # Disable Nagle's algorithm so state publishes go out immediately instead
+    # of stalling behind the broker's delayed ACK. Runs on every (re)connect.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
 def on_message(client, userdata, message):
     topic = message.topic
     payload = message.payload.decode("utf-8")
@@ -70,7 +104,7 @@ def on_message(client, userdata, message):
         # Handle broadcast requests
         elif topic == "devices/broadcast/request":
             # Parse the message
-            msg_data = json.loads(payload)
+            msg_data = orjson.loads(message.payload)
             action = msg_data.get("action")
             
             # If action is to report state, publish our state
@@ -82,73 +116,145 @@ def on_message(client, userdata, message):
                 response = {
                     "device_id": DEVICE_ID,
                     "response_to": msg_data.get("request_id"),
-                    "state": device_state
+                    "state": orjson.Fragment(device_state_json)
                 }
-                mqtt_client.publish("devices/broadcast/response", json.dumps(response))
+                # Discovery responses are one-shot, so they keep QoS 1
+                enqueue_publish("devices/broadcast/response", orjson.dumps(response), qos=1)
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
 
 def handle_command(payload_str):
     try:
-        payload = json.loads(payload_str)
+        payload = orjson.loads(payload_str)
         command = payload.get("command")
         
         logger.info(f"Processing command: {command} with payload: {payload_str}")
         
         if command == "toggle":
             # Toggle power state
-            device_state["properties"]["power"] = not device_state["properties"]["power"]
-            logger.info(f"Toggled light bulb power to: {device_state['properties']['power']}")
+            state = toggle_power()
+            logger.info(f"Toggled light bulb power to: {state['properties']['power']}")
         
         elif command == "set_power" and "payload" in payload:
             # Set power state directly
             power_state = payload["payload"].get("power", False)
-            old_state = device_state["properties"]["power"]
-            device_state["properties"]["power"] = bool(power_state)
-            logger.info(f"Set light bulb power from {old_state} to {device_state['properties']['power']}")
+            # Read the old value under the writer lock so the log line matches
+            # the update even with concurrent writers
+            with _state_lock:
+                old_state = device_state["properties"]["power"]
+                state = update_state(properties={"power": bool(power_state)})
+            logger.info(f"Set light bulb power from {old_state} to {state['properties']['power']}")
         
         elif command == "set_brightness" and "payload" in payload:
             # Set brightness
             brightness = payload["payload"].get("brightness", 100)
-            device_state["properties"]["brightness"] = max(0, min(100, int(brightness)))
-            logger.info(f"Set light bulb brightness to: {device_state['properties']['brightness']}")
+            state = update_state(properties={"brightness": max(0, min(100, int(brightness)))})
+            logger.info(f"Set light bulb brightness to: {state['properties']['brightness']}")
         
         elif command == "set_color" and "payload" in payload:
             # Set color
             color = payload["payload"].get("color")
             if color:
-                device_state["properties"]["color"] = color
-                logger.info(f"Set light bulb color to: {device_state['properties']['color']}")
+                state = update_state(properties={"color": color})
+                logger.info(f"Set light bulb color to: {state['properties']['color']}")
         else:
             logger.warning(f"Unknown command or missing payload: {command}")
         
-        # Publish updated state
-        publish_state()
-    except json.JSONDecodeError:
+        # Publish updated state, merged with any other commands in the burst
+        mark_state_dirty()
+    except orjson.JSONDecodeError:
         logger.error(f"Invalid JSON payload: {payload_str}")
     except Exception as e:
         logger.error(f"Error handling command: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
 
+def utc_timestamp():
+    """Current UTC time as ISO-8601, formatted at most once per second"""
+    global _last_timestamp
+    now = int(time.time())
+    if _last_timestamp[0] != now:
+        _last_timestamp = (now, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)))
+    return _last_timestamp[1]
+
+def update_state(properties=None):
+    """Swap in a copy of device_state with the given property changes, refreshing last_seen and the cached JSON"""
+    global device_state, device_state_json
+    with _state_lock:
+        new_state = {**device_state}
+        if properties:
+            new_state["properties"] = {**device_state["properties"], **properties}
+        new_state["last_seen"] = utc_timestamp()
+        device_state = new_state
+        device_state_json = orjson.dumps(new_state)
+    return new_state
+
+def toggle_power():
+    """Flip the power property, returning the new state"""
+    with _state_lock:
+        return update_state(properties={"power": not device_state["properties"]["power"]})
+
+def enqueue_publish(topic, payload, qos=0):
+    """Queue a message for publish_worker"""
+    _outbound.append((topic, payload, qos))
+    _outbound_ready.set()
+
 def publish_state():
     """Publish current state to MQTT"""
     try:
-        # Update last_seen timestamp
-        device_state["last_seen"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-        mqtt_client.publish(STATE_TOPIC, json.dumps(device_state))
-        logger.info(f"Published state: {json.dumps(device_state)}")
+        # QoS 0: state is re-published on every change and by the heartbeat,
+        # so a lost message is superseded by the next one
+        state_json = device_state_json
+        _outbound_state.append(state_json)
+        _outbound_ready.set()
+        logger.info(f"Queued state: {state_json.decode()}")
     except Exception as e:
         logger.error(f"Error publishing state: {str(e)}")
 
-# Heartbeat function to periodically publish state
-def heartbeat():
+def mark_state_dirty():
+    """Schedule one publish_state for all changes made within the coalescing window"""
+    global _flush_timer
+    with _flush_lock:
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(STATE_COALESCE_SECONDS, _flush_state)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def _flush_state():
+    global _flush_timer
+    with _flush_lock:
+        _flush_timer = None
+    publish_state()
+
+def publish_worker():
+    """Publish queued messages, and the periodic heartbeat state, from a single thread"""
+    next_heartbeat = time.monotonic()
     while True:
-        try:
-            publish_state()
-        except Exception as e:
-            logger.error(f"Error in heartbeat: {str(e)}")
-        time.sleep(60)  # Publish state every 60 seconds
+        if time.monotonic() >= next_heartbeat:
+            try:
+                # Refresh last_seen so subscribers can tell the bulb is still alive
+                update_state()
+                publish_state()
+            except Exception as e:
+                logger.error(f"Error in heartbeat: {str(e)}")
+            next_heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+        
+        # Sleep until something is queued or the next heartbeat is due.
+        # Clear before draining so an append during the drain re-arms the event.
+        _outbound_ready.wait(max(0, next_heartbeat - time.monotonic()))
+        _outbound_ready.clear()
+        while _outbound_state:
+            state_json = _outbound_state.popleft()
+            try:
+                mqtt_client.publish(STATE_TOPIC, state_json, qos=0)
+            except Exception as e:
+                logger.error(f"Error publishing state: {str(e)}")
+        while _outbound:
+            topic, payload, qos = _outbound.popleft()
+            try:
+                mqtt_client.publish(topic, payload, qos=qos)
+            except Exception as e:
+                logger.error(f"Error publishing to {topic}: {str(e)}")
 
 # Routes
 @app.route('/')
@@ -157,53 +263,55 @@ def index():
 
 @app.route('/api/state', methods=['GET'])
 def get_state():
-    return jsonify(device_state)
+    return Response(device_state_json, mimetype='application/json')
 
 @app.route('/api/toggle', methods=['POST'])
 def toggle_light():
-    device_state["properties"]["power"] = not device_state["properties"]["power"]
+    state = toggle_power()
     publish_state()
-    return jsonify({"success": True, "power": device_state["properties"]["power"]})
+    return jsonify({"success": True, "power": state["properties"]["power"]})
 
 @app.route('/api/brightness', methods=['POST'])
 def set_brightness():
     data = request.json
     brightness = data.get('brightness', 100)
-    device_state["properties"]["brightness"] = max(0, min(100, int(brightness)))
+    state = update_state(properties={"brightness": max(0, min(100, int(brightness)))})
     publish_state()
-    return jsonify({"success": True, "brightness": device_state["properties"]["brightness"]})
+    return jsonify({"success": True, "brightness": state["properties"]["brightness"]})
 
 @app.route('/api/color', methods=['POST'])
 def set_color():
     data = request.json
     color = data.get('color', "#FFFF00")
-    device_state["properties"]["color"] = color
+    state = update_state(properties={"color": color})
     publish_state()
-    return jsonify({"success": True, "color": device_state["properties"]["color"]})
+    return jsonify({"success": True, "color": state["properties"]["color"]})
 
 def start_mqtt():
     mqtt_client.on_connect = on_connect
     mqtt_client.on_message = on_message
+    mqtt_client.on_socket_open = on_socket_open
     
     try:
         mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
         mqtt_client.loop_start()
     except Exception as e:
         logger.error(f"Failed to connect to MQTT broker: {str(e)}")
+        return
+    
+    # paho's network loop already runs in its own thread, so this thread has
+    # nothing left to do; reuse it as the publisher, which also runs the heartbeat
+    publish_worker()
 
 if __name__ == '__main__':
-    # Start MQTT client in a separate thread
+    # Start MQTT client and publisher in a separate thread
     mqtt_thread = threading.Thread(target=start_mqtt)
     mqtt_thread.daemon = True
     mqtt_thread.start()
     
-    # Start heartbeat in a separate thread
-    heartbeat_thread = threading.Thread(target=heartbeat)
-    heartbeat_thread.daemon = True
-    heartbeat_thread.start()
-    
     # Give MQTT client time to connect and publish initial state
     time.sleep(2)
     
-    # Start Flask web server
-    app.run(host='0.0.0.0', port=7003, debug=True, use_reloader=False)
\ No newline at end of file
+    # Serve the Flask app with waitress rather than the single-threaded
+    # Werkzeug dev server. One process keeps the MQTT client shared.
+    serve(app, host='0.0.0.0', port=7003, threads=8)
\ No newline at end of file